@@ -889,7 +889,8 @@ class Mech(MechCommand):
             if command:
                 cmds.extend(('--', command))
 
-            logger.debug(" ".join("'{}'".format(c.replace("'", "\\'")) if ' ' in c else c for c in cmds))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(" ".join("'{}'".format(c.replace("'", "\\'")) if ' ' in c else c for c in cmds))
             return subprocess.call(cmds)
         finally:
             os.unlink(fp.name)
@@ -940,7 +941,8 @@ class Mech(MechCommand):
             src = '{}:{}'.format(host, src) if src_is_host else src
             cmds.extend((src, dst))
 
-            logger.debug(" ".join("'{}'".format(c.replace("'", "\\'")) if ' ' in c else c for c in cmds))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(" ".join("'{}'".format(c.replace("'", "\\'")) if ' ' in c else c for c in cmds))
             return subprocess.call(cmds)
         finally:
             os.unlink(fp.name)
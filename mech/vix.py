@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 German Mendez Bravo (Kronuz)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+'''Optional VIX C API backend.
+
+Talks to VMware through the VIX shared library instead of forking the
+vmrun binary for every call, holding one authenticated host connection
+(pooled per host) for the life of the process. Requires the VIX library
+shipped with Workstation/Fusion/Player; `VixVM` raises `VixUnavailable`
+when it cannot be found. The surface mirrors the `VMrun` method names so
+callers can swap backends for hot loops.
+'''
+
+from __future__ import absolute_import
+
+import os
+import sys
+import ctypes
+import ctypes.util
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+VIX_API_VERSION = -1
+VIX_INVALID_HANDLE = 0
+
+VIX_OK = 0
+
+VIX_PROPERTY_NONE = 0
+VIX_PROPERTY_JOB_RESULT_HANDLE = 3010
+VIX_PROPERTY_JOB_RESULT_GUEST_OBJECT_EXISTS = 3011
+
+VIX_SERVICEPROVIDER_DEFAULT = 1
+VIX_SERVICEPROVIDER_VMWARE_SERVER = 2
+VIX_SERVICEPROVIDER_VMWARE_WORKSTATION = 3
+VIX_SERVICEPROVIDER_VMWARE_PLAYER = 4
+VIX_SERVICEPROVIDER_VMWARE_VI_SERVER = 10
+
+#: vmrun -T provider names mapped onto VIX service providers
+PROVIDERS = {
+    'ws': VIX_SERVICEPROVIDER_VMWARE_WORKSTATION,
+    'fusion': VIX_SERVICEPROVIDER_VMWARE_WORKSTATION,
+    'player': VIX_SERVICEPROVIDER_VMWARE_PLAYER,
+    'server': VIX_SERVICEPROVIDER_VMWARE_VI_SERVER,
+}
+
+VIX_VMOPEN_NORMAL = 0
+VIX_VMPOWEROP_NORMAL = 0
+VIX_VMPOWEROP_LAUNCH_GUI = 0x0200
+VIX_VMPOWEROP_FROM_GUEST = 0x0004
+VIX_RUNPROGRAM_RETURN_IMMEDIATELY = 0x0001
+
+VixHandle = ctypes.c_int
+VixError = ctypes.c_uint64
+
+
+class VixException(Exception):
+    '''A VIX call returned a non-OK error code.'''
+
+    def __init__(self, error, message):
+        super(VixException, self).__init__("[{}] {}".format(error, message))
+        self.error = error
+
+
+class VixUnavailable(VixException):
+    '''The VIX shared library could not be located or loaded.'''
+
+    def __init__(self, message):
+        Exception.__init__(self, message)
+        self.error = None
+
+
+def _library_candidates():
+    if sys.platform == 'darwin':
+        yield '/Applications/VMware Fusion.app/Contents/Public/libvixAllProducts.dylib'
+    elif sys.platform == 'win32':
+        for program_files in ('ProgramFiles(x86)', 'ProgramFiles'):
+            base = os.environ.get(program_files)
+            if base:
+                yield os.path.join(base, 'VMware', 'VMware VIX', 'Vix64AllProductsDyn.dll')
+                yield os.path.join(base, 'VMware', 'VMware VIX', 'VixAllProductsDyn.dll')
+    else:
+        yield '/usr/lib/vmware-vix/lib/libvixAllProducts.so'
+        yield '/usr/lib/vmware-vix/libvixAllProducts.so'
+    found = ctypes.util.find_library('vixAllProducts')
+    if found:
+        yield found
+
+
+_vix_lib = None
+_vix_lib_lock = threading.Lock()
+
+
+def load_vix():
+    '''Load (once) and return the VIX shared library.'''
+    global _vix_lib
+    with _vix_lib_lock:
+        if _vix_lib is None:
+            for candidate in _library_candidates():
+                if os.path.sep in candidate and not os.path.exists(candidate):
+                    continue
+                try:
+                    _vix_lib = ctypes.CDLL(candidate)
+                    break
+                except OSError:
+                    continue
+            else:
+                raise VixUnavailable("Cannot locate the VIX library; is VMware VIX installed?")
+            _vix_lib.Vix_GetErrorText.restype = ctypes.c_char_p
+            _vix_lib.Vix_GetErrorText.argtypes = [VixError, ctypes.c_char_p]
+            _vix_lib.VixJob_Wait.restype = VixError
+            _vix_lib.VixHost_Connect.restype = VixHandle
+            _vix_lib.VixHost_OpenVM.restype = VixHandle
+        return _vix_lib
+
+
+def _check(error):
+    error = int(error) & 0xffff
+    if error != VIX_OK:
+        vix = load_vix()
+        message = vix.Vix_GetErrorText(VixError(error), None)
+        raise VixException(error, message.decode('latin-1') if message else 'Unknown VIX error')
+
+
+def _wait(job):
+    '''Wait for a job, release it, and check its error code.'''
+    vix = load_vix()
+    try:
+        _check(vix.VixJob_Wait(VixHandle(job), ctypes.c_int(VIX_PROPERTY_NONE)))
+    finally:
+        vix.Vix_ReleaseHandle(VixHandle(job))
+
+
+def _wait_for_handle(job):
+    '''Wait for a job and return its result handle.'''
+    vix = load_vix()
+    result = VixHandle(VIX_INVALID_HANDLE)
+    try:
+        _check(vix.VixJob_Wait(
+            VixHandle(job),
+            ctypes.c_int(VIX_PROPERTY_JOB_RESULT_HANDLE), ctypes.byref(result),
+            ctypes.c_int(VIX_PROPERTY_NONE)))
+    finally:
+        vix.Vix_ReleaseHandle(VixHandle(job))
+    return result.value
+
+
+def _wait_for_bool(job, property_id):
+    '''Wait for a job and return one of its boolean result properties.'''
+    vix = load_vix()
+    result = ctypes.c_int(0)
+    try:
+        _check(vix.VixJob_Wait(
+            VixHandle(job),
+            ctypes.c_int(property_id), ctypes.byref(result),
+            ctypes.c_int(VIX_PROPERTY_NONE)))
+    finally:
+        vix.Vix_ReleaseHandle(VixHandle(job))
+    return bool(result.value)
+
+
+def _b(value):
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return value
+    return value.encode('latin-1')
+
+
+#: Authenticated host connections pooled per (provider, host, user, password)
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def connect_host(provider='ws', host=None, user=None, password=None):
+    '''Return a (pooled) authenticated VIX host handle.'''
+    key = (provider, host, user, password)
+    with _hosts_lock:
+        handle = _hosts.get(key)
+        if handle is None:
+            vix = load_vix()
+            job = vix.VixHost_Connect(
+                ctypes.c_int(VIX_API_VERSION),
+                ctypes.c_int(PROVIDERS.get(provider, VIX_SERVICEPROVIDER_DEFAULT)),
+                _b(host), ctypes.c_int(0), _b(user), _b(password),
+                ctypes.c_int(0), VixHandle(VIX_INVALID_HANDLE),
+                None, None)
+            handle = _hosts[key] = _wait_for_handle(job)
+        return handle
+
+
+def disconnect_all():
+    '''Drop every pooled host connection (mostly for tests/teardown).'''
+    with _hosts_lock:
+        if _hosts:
+            vix = load_vix()
+            for handle in _hosts.values():
+                vix.VixHost_Disconnect(VixHandle(handle))
+            _hosts.clear()
+
+
+class VixVM(object):
+    '''A VM driven through the VIX library, mirroring `VMrun` method names.
+
+    The host connection and the opened VM handle are established once and
+    reused by every call, so per-operation cost is one library roundtrip
+    instead of a process spawn plus a fresh VIX handshake.
+    '''
+
+    def __init__(self, vmx_file, user=None, password=None, provider='ws',
+                 server_host=None, server_user=None, server_password=None):
+        self.vmx_file = vmx_file
+        self.user = user
+        self.password = password
+        self._vix = load_vix()
+        self._host = connect_host(provider, server_host, server_user, server_password)
+        job = self._vix.VixHost_OpenVM(
+            VixHandle(self._host), _b(vmx_file),
+            ctypes.c_int(VIX_VMOPEN_NORMAL), VixHandle(VIX_INVALID_HANDLE),
+            None, None)
+        self._vm = _wait_for_handle(job)
+        self._logged_in = False
+
+    def close(self):
+        if self._vm != VIX_INVALID_HANDLE:
+            self._vix.Vix_ReleaseHandle(VixHandle(self._vm))
+            self._vm = VIX_INVALID_HANDLE
+
+    def _login(self):
+        if not self._logged_in:
+            job = self._vix.VixVM_LoginInGuest(
+                VixHandle(self._vm), _b(self.user), _b(self.password),
+                ctypes.c_int(0), None, None)
+            _wait(job)
+            self._logged_in = True
+
+    def start(self, gui=False):
+        '''Start the VM'''
+        options = VIX_VMPOWEROP_LAUNCH_GUI if gui else VIX_VMPOWEROP_NORMAL
+        job = self._vix.VixVM_PowerOn(
+            VixHandle(self._vm), ctypes.c_int(options),
+            VixHandle(VIX_INVALID_HANDLE), None, None)
+        _wait(job)
+
+    def stop(self, mode='soft'):
+        '''Stop the VM'''
+        options = VIX_VMPOWEROP_FROM_GUEST if mode == 'soft' else VIX_VMPOWEROP_NORMAL
+        job = self._vix.VixVM_PowerOff(VixHandle(self._vm), ctypes.c_int(options), None, None)
+        _wait(job)
+
+    def suspend(self):
+        '''Suspend the VM'''
+        job = self._vix.VixVM_Suspend(VixHandle(self._vm), ctypes.c_int(0), None, None)
+        _wait(job)
+
+    def fileExistsInGuest(self, file):
+        '''Check if a file exists in Guest OS'''
+        self._login()
+        job = self._vix.VixVM_FileExistsInGuest(VixHandle(self._vm), _b(file), None, None)
+        return _wait_for_bool(job, VIX_PROPERTY_JOB_RESULT_GUEST_OBJECT_EXISTS)
+
+    def directoryExistsInGuest(self, path):
+        '''Check if a directory exists in Guest OS'''
+        self._login()
+        job = self._vix.VixVM_DirectoryExistsInGuest(VixHandle(self._vm), _b(path), None, None)
+        return _wait_for_bool(job, VIX_PROPERTY_JOB_RESULT_GUEST_OBJECT_EXISTS)
+
+    def copyFileFromHostToGuest(self, host_path, guest_path):
+        '''Copy a file from host OS to guest OS'''
+        self._login()
+        job = self._vix.VixVM_CopyFileFromHostToGuest(
+            VixHandle(self._vm), _b(host_path), _b(guest_path),
+            ctypes.c_int(0), VixHandle(VIX_INVALID_HANDLE), None, None)
+        _wait(job)
+
+    def copyFileFromGuestToHost(self, guest_path, host_path):
+        '''Copy a file from guest OS to host OS'''
+        self._login()
+        job = self._vix.VixVM_CopyFileFromGuestToHost(
+            VixHandle(self._vm), _b(guest_path), _b(host_path),
+            ctypes.c_int(0), VixHandle(VIX_INVALID_HANDLE), None, None)
+        _wait(job)
+
+    def deleteFileInGuest(self, file):
+        '''Delete a file in Guest OS'''
+        self._login()
+        job = self._vix.VixVM_DeleteFileInGuest(VixHandle(self._vm), _b(file), None, None)
+        _wait(job)
+
+    def createDirectoryInGuest(self, path):
+        '''Create a directory in Guest OS'''
+        self._login()
+        job = self._vix.VixVM_CreateDirectoryInGuest(
+            VixHandle(self._vm), _b(path), VixHandle(VIX_INVALID_HANDLE), None, None)
+        _wait(job)
+
+    def runProgramInGuest(self, program_path, program_arguments='', wait=True):
+        '''Run a program in Guest OS'''
+        self._login()
+        options = 0 if wait else VIX_RUNPROGRAM_RETURN_IMMEDIATELY
+        job = self._vix.VixVM_RunProgramInGuest(
+            VixHandle(self._vm), _b(program_path), _b(program_arguments),
+            ctypes.c_int(options), VixHandle(VIX_INVALID_HANDLE), None, None)
+        _wait(job)
+
+    def runScriptInGuest(self, interpreter_path, script, wait=True):
+        '''Run a script in Guest OS'''
+        self._login()
+        options = 0 if wait else VIX_RUNPROGRAM_RETURN_IMMEDIATELY
+        job = self._vix.VixVM_RunScriptInGuest(
+            VixHandle(self._vm), _b(interpreter_path), _b(script),
+            ctypes.c_int(options), VixHandle(VIX_INVALID_HANDLE), None, None)
+        _wait(job)
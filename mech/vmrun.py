@@ -25,26 +25,99 @@ from __future__ import absolute_import
 
 import os
 import sys
+import json
+import shutil
+import base64
 import logging
+import functools
+import threading
 import subprocess
 import tempfile
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # Python 2 without the futures backport
+    ThreadPoolExecutor = None
+
+try:
+    from functools import lru_cache
+except ImportError:  # functools.lru_cache is Python 3 only
+    def lru_cache(maxsize=None):
+        def decorator(func):
+            cache = {}
+
+            @functools.wraps(func)
+            def wrapper():
+                if 'value' not in cache:
+                    cache['value'] = func()
+                return cache['value']
+            return wrapper
+        return decorator
 
 from .compat import PY3, b2s
 
+try:
+    DEVNULL = subprocess.DEVNULL
+except AttributeError:  # Python 2
+    DEVNULL = open(os.devnull, 'wb')
+
+#: Extra Popen kwargs applied to every vmrun invocation, precomputed once.
+#: On Python 3, have subprocess decode the child's output while draining it,
+#: so stdout/stderr come back as `str` in a single pass (same latin-1 used by
+#: compat.b2s, which then passes them through untouched). On POSIX, keeping
+#: the fd table inherited (close_fds=False) lets CPython 3.8+ launch these
+#: short-lived children through posix_spawn() instead of fork()+exec().
+#: bufsize=-1 requests a full block buffer explicitly; Python 2 defaulted to
+#: unbuffered pipes, which costs a read() syscall per byte-sized chunk.
+_POPEN_KWARGS = {'bufsize': -1}
+if PY3:
+    _POPEN_KWARGS['encoding'] = 'latin-1'
+    if os.name == 'posix':
+        _POPEN_KWARGS['close_fds'] = False
+
 logger = logging.getLogger(__name__)
 
+#: Clock for cache timestamps (time.monotonic is Python 3 only)
+_monotonic = getattr(time, 'monotonic', time.time)
+
+#: How long a negative VMware Tools state probe stays fresh (seconds);
+#: kept short so poll loops waiting for Tools during guest boot converge
+#: quickly. Positives are trusted until a state-changing command.
+TOOLS_STATE_TTL = 1
+
+#: Commands that can change the guest's power or Tools state; issuing one
+#: invalidates the cached `installedTools` result.
+_TOOLS_STATE_CHANGERS = frozenset((
+    'start', 'stop', 'reset', 'suspend', 'revertToSnapshot', 'installTools',
+))
 
+
+@lru_cache(maxsize=1)
 def get_fallback_executable():
-    if 'PATH' in os.environ:
-        for path in os.environ['PATH'].split(os.pathsep):
-            vmrun = os.path.join(path, 'vmrun')
-            if os.path.exists(vmrun):
-                return vmrun
-            vmrun = os.path.join(path, 'vmrun.exe')
-            if os.path.exists(vmrun):
+    which = getattr(shutil, 'which', None)
+    if which is not None:
+        return which('vmrun') or which('vmrun.exe')
+    # Python 2 has no shutil.which; probe the PATH by hand, visiting each
+    # directory once and spending one access() syscall per candidate,
+    # short-circuiting on the first hit
+    seen = set()
+    for path in os.environ.get('PATH', '').split(os.pathsep):
+        if not path or path in seen:
+            continue
+        seen.add(path)
+        for name in ('vmrun', 'vmrun.exe'):
+            vmrun = os.path.join(path, name)
+            if os.access(vmrun, os.X_OK):
                 return vmrun
 
 
+@lru_cache(maxsize=1)
 def get_darwin_executable():
     vmrun = '/Applications/VMware Fusion.app/Contents/Library/vmrun'
     if os.path.exists(vmrun):
@@ -52,28 +125,56 @@ def get_darwin_executable():
     return get_fallback_executable()
 
 
-def get_win32_executable():
+@lru_cache(maxsize=1)
+def get_win32_install_path():
+    '''VMware Workstation install path, resolved once per process.
+
+    A VMWARE_HOME environment override wins; otherwise the InstallPath
+    is read from HKLM.'''
+    vmware_home = os.environ.get('VMWARE_HOME')
+    if vmware_home:
+        return vmware_home
     if PY3:
         import winreg
     else:
         import _winreg as winreg
     reg = winreg.ConnectRegistry(None, winreg.HKEY_LOCAL_MACHINE)
     try:
-        key = winreg.OpenKey(reg, 'SOFTWARE\\VMware, Inc.\\VMware Workstation')
-        try:
-            return os.path.join(winreg.QueryValueEx(key, 'InstallPath')[0], 'vmrun.exe')
-        finally:
-            winreg.CloseKey(key)
-    except WindowsError:
-        key = winreg.OpenKey(reg, 'SOFTWARE\\WOW6432Node\\VMware, Inc.\\VMware Workstation')
-        try:
-            return os.path.join(winreg.QueryValueEx(key, 'InstallPath')[0], 'vmrun.exe')
-        finally:
-            winreg.CloseKey(key)
+        for subkey in ('SOFTWARE\\VMware, Inc.\\VMware Workstation',
+                       'SOFTWARE\\WOW6432Node\\VMware, Inc.\\VMware Workstation'):
+            try:
+                key = winreg.OpenKey(reg, subkey)
+            except WindowsError:
+                continue
+            try:
+                return winreg.QueryValueEx(key, 'InstallPath')[0]
+            finally:
+                winreg.CloseKey(key)
     finally:
         reg.Close()
+
+
+@lru_cache(maxsize=1)
+def get_win32_executable():
+    install_path = get_win32_install_path()
+    if install_path:
+        return os.path.join(install_path, 'vmrun.exe')
+    return get_fallback_executable()
+
+@lru_cache(maxsize=1)
+def get_default_executable():
+    if sys.platform == 'darwin':
+        return get_darwin_executable()
+    elif sys.platform == 'win32':
+        return get_win32_executable()
     return get_fallback_executable()
 
+
+@lru_cache(maxsize=1)
+def get_default_provider():
+    return get_provider(get_default_executable())
+
+
 def get_provider(vmrun_exe):
     """
     identifies the right hosttype for vmrun command (ws | fusion | player)
@@ -88,7 +189,7 @@ def get_provider(vmrun_exe):
             if os.name == "nt":
                 startupinfo = subprocess.STARTUPINFO()
                 startupinfo.dwFlags |= subprocess.SW_HIDE | subprocess.STARTF_USESHOWWINDOW
-            proc = subprocess.Popen([vmrun_exe, '-T', provider, 'list'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startupinfo)
+            proc = subprocess.Popen([vmrun_exe, '-T', provider, 'list'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startupinfo, **_POPEN_KWARGS)
         except OSError:
             pass
 
@@ -97,60 +198,293 @@ def get_provider(vmrun_exe):
             return provider
 
 
+def parallel(calls, max_workers=None):
+    '''Run callables concurrently and return their results in order.
+
+    Meant for fanning one operation out across many VMs, e.g.::
+
+        ips = parallel(functools.partial(VMrun(vmx).getGuestIPAddress, wait=False)
+                       for vmx in vmx_files)
+
+    Each call spends nearly all its time waiting on a child process, so
+    threads overlap them fine. Falls back to sequential execution on
+    Python 2 without the futures backport, or for a single call.
+    '''
+    calls = list(calls)
+    if ThreadPoolExecutor is None or len(calls) <= 1:
+        return [call() for call in calls]
+    if max_workers is None:
+        max_workers = min(len(calls), 8)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        return list(executor.map(lambda call: call(), calls))
+    finally:
+        executor.shutdown()
+
+
+class VMrunError(Exception):
+    '''vmrun exited with a nonzero status.
+
+    Only raised by instances created with raise_errors=True; by default
+    failures are logged and reported as a None return.'''
+
+    def __init__(self, cmd, returncode, stdout, stderr):
+        message = "vmrun {} failed ({})".format(cmd, returncode)
+        details = os.linesep.join(s.strip() for s in (stderr, stdout) if s and s.strip())
+        if details:
+            message = "{}: {}".format(message, details)
+        super(VMrunError, self).__init__(message)
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+#: Shim executed by every `VMrunPool` worker: reads one base64-encoded JSON
+#: argv per line from stdin, prepends the prefix baked into its environment,
+#: runs it and writes one base64-encoded JSON result line back.
+_POOL_WORKER_SOURCE = r'''
+import os
+import sys
+import json
+import base64
+import subprocess
+
+prefix = json.loads(os.environ.get('VMRUN_PREFIX', '[]'))
+for line in sys.stdin:
+    line = line.strip()
+    if not line:
+        continue
+    argv = prefix + json.loads(base64.b64decode(line).decode('utf-8'))
+    try:
+        proc = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=-1)
+        stdoutdata, stderrdata = proc.communicate()
+        result = {'returncode': proc.returncode, 'stdout': stdoutdata.decode('latin-1'), 'stderr': stderrdata.decode('latin-1')}
+    except OSError as exc:
+        result = {'returncode': -1, 'stdout': '', 'stderr': str(exc)}
+    sys.stdout.write(base64.b64encode(json.dumps(result).encode('utf-8')).decode('ascii') + '\n')
+    sys.stdout.flush()
+'''
+
+
+class VMrunPool(object):
+    '''Fixed-size pool of long-lived worker processes running vmrun commands.
+
+    Each worker is a tiny Python shim that reads commands over stdin and
+    invokes vmrun for each, so a batch of K commands costs one worker spawn
+    per pool slot instead of K process spawns. Workers exit on stdin EOF.
+    '''
+
+    def __init__(self, prefix, workers=4):
+        self.prefix = list(prefix)
+        env = dict(os.environ)
+        env['VMRUN_PREFIX'] = json.dumps(self.prefix)
+        startupinfo = None
+        if os.name == "nt":
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.SW_HIDE | subprocess.STARTF_USESHOWWINDOW
+        self.workers = []
+        for _ in range(workers):
+            self.workers.append(subprocess.Popen(
+                [sys.executable, '-u', '-c', _POOL_WORKER_SOURCE],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=-1,
+                env=env, startupinfo=startupinfo))
+
+    def run(self, ops):
+        '''Dispatch ops across the workers; return their results in order.'''
+        results = [None] * len(ops)
+        pending = queue.Queue()
+        for item in enumerate(ops):
+            pending.put(item)
+
+        def work(proc):
+            while True:
+                try:
+                    i, op = pending.get_nowait()
+                except queue.Empty:
+                    return
+                payload = base64.b64encode(json.dumps([a for a in op if a is not None]).encode('utf-8'))
+                proc.stdin.write(payload + b'\n')
+                proc.stdin.flush()
+                results[i] = json.loads(base64.b64decode(proc.stdout.readline()).decode('utf-8'))
+
+        threads = []
+        for proc in self.workers:
+            thread = threading.Thread(target=work, args=(proc,))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return results
+
+    def close(self):
+        for proc in self.workers:
+            try:
+                proc.stdin.close()
+            except (OSError, IOError):
+                pass
+            proc.wait()
+        self.workers = []
+
+
 class VMrun(object):
-    if sys.platform == 'darwin':
-        default_executable = get_darwin_executable()
-    elif sys.platform == 'win32':
-        default_executable = get_win32_executable()
-    else:
-        default_executable = get_fallback_executable()
-    default_provider = get_provider(default_executable)
 
-    def __init__(self, vmx_file=None, user=None, password=None, executable=None, provider=None):
+    def __init__(self, vmx_file=None, user=None, password=None, executable=None, provider=None,
+                 server_host=None, server_user=None, server_password=None, raise_errors=False):
         self.vmx_file = vmx_file
+        self.raise_errors = raise_errors
         self.user = user
         self.password = password
-        self.executable = executable or self.default_executable
-        self.provider = provider or self.default_provider
+        self.server_host = server_host
+        self.server_user = server_user
+        self.server_password = server_password
+        self.executable = executable or get_default_executable()
+        self.provider = provider or ('server' if server_host else get_default_provider())
+        self._prefix = tuple(self._vmrun_prefix())
+        # Per-command argv bases ("<prefix> <cmd>") specialized on first
+        # use, so hot commands skip re-assembling the invariant part of
+        # the command line on every call.
+        self._cmd_base = {}
+        self._pool = None
+        self._tools_state = None
+        # Pre-bind the hot dispatcher: every command method goes through
+        # self.vmrun, so caching the bound method on the instance skips
+        # the descriptor protocol on each of those lookups.
+        self.vmrun = self.vmrun
+
+    def _vmrun_prefix(self):
+        prefix = [self.executable, '-T', self.provider]
+        # Host-session options for remote (VI server / ESX) targets are
+        # configured once here and reused by every command; the vmrun CLI
+        # itself offers no persistent connection to amortize further.
+        if self.server_host:
+            prefix.extend(('-h', self.server_host))
+        if self.server_user:
+            prefix.extend(('-u', self.server_user))
+        if self.server_password:
+            prefix.extend(('-p', self.server_password))
+        if self.user:
+            prefix.extend(('-gu', self.user))
+        if self.password:
+            prefix.extend(('-gp', self.password))
+        return prefix
+
+    def batch(self, ops, quiet=False):
+        '''Run many vmrun commands through a pool of persistent workers.
+
+        `ops` is a sequence of (cmd, arg, ...) tuples, e.g.
+        ('fileExistsInGuest', self.vmx_file, path); the `-T`/`-gu`/`-gp`
+        prefix is added by the workers. Results come back in order, with
+        the same contract as `vmrun()` (stripped stdout, or None on error).
+        The pool is created on first use and reused across calls; a single
+        op falls back to a plain sequential spawn.
+        '''
+        ops = list(ops)
+        if not ops:
+            return []
+        if any(op[0] in _TOOLS_STATE_CHANGERS for op in ops):
+            self._tools_state = None
+        if len(ops) == 1:
+            return [self.vmrun(ops[0][0], *ops[0][1:], quiet=quiet)]
+        if self._pool is None:
+            self._pool = VMrunPool(self._vmrun_prefix())
+        outputs = []
+        for result in self._pool.run(ops):
+            if result['stderr'] and not quiet:
+                logger.error(result['stderr'].strip())
+            if not result['returncode']:
+                outputs.append(result['stdout'].strip())
+            else:
+                if result['stdout'] and not quiet:
+                    logger.error(result['stdout'].strip())
+                outputs.append(None)
+        return outputs
 
     def vmrun(self, cmd, *args, **kwargs):
         quiet = kwargs.pop('quiet', False)
+        capture = kwargs.pop('capture', True)
         arguments = kwargs.pop('arguments', ())
 
-        cmds = [self.executable]
-        cmds.append('-T')
-        cmds.append(self.provider)
-        if self.user:
-            cmds.append('-gu')
-            cmds.append(self.user)
-        if self.password:
-            cmds.append('-gp')
-            cmds.append(self.password)
-        cmds.append(cmd)
-        cmds.extend(filter(None, args))
-        cmds.extend(filter(None, arguments))
+        if cmd in _TOOLS_STATE_CHANGERS:
+            self._tools_state = None
+
+        try:
+            base = self._cmd_base[cmd]
+        except KeyError:
+            base = self._cmd_base[cmd] = self._prefix + (cmd,)
+        cmds = list(base)
+        cmds.extend(a for a in args if a is not None)
+        cmds.extend(a for a in arguments if a is not None)
 
-        logger.debug(" ".join("'{}'".format(c.replace("'", "\\'")) if ' ' in c else c for c in cmds))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(" ".join("'{}'".format(c.replace("'", "\\'")) if ' ' in c else c for c in cmds))
 
         startupinfo = None
         if os.name == "nt":
             startupinfo = subprocess.STARTUPINFO()
             startupinfo.dwFlags |= subprocess.SW_HIDE | subprocess.STARTF_USESHOWWINDOW
-        proc = subprocess.Popen(cmds, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startupinfo)
+        proc = subprocess.Popen(cmds, stdout=subprocess.PIPE if capture else DEVNULL, stderr=subprocess.PIPE, startupinfo=startupinfo, **_POPEN_KWARGS)
         stdoutdata, stderrdata = map(b2s, proc.communicate())
 
-        if stderrdata and not quiet:
+        if stderrdata and not quiet and not self.raise_errors:
             logger.error(stderrdata.strip())
-        logger.debug("(⏎ %s)" % proc.returncode)
+        logger.debug("(⏎ %s)", proc.returncode)
 
         if not proc.returncode:
+            if not capture:
+                return ''
             stdoutdata = stdoutdata.strip()
-            logger.debug(repr(stdoutdata))
+            logger.debug("%r", stdoutdata)
             return stdoutdata
 
+        if self.raise_errors:
+            raise VMrunError(cmd, proc.returncode, stdoutdata, stderrdata)
+
         if stdoutdata and not quiet:
             logger.error(stdoutdata.strip())
 
+    def vmrun_stream(self, cmd, *args, **kwargs):
+        '''Like `vmrun`, but yield the child's stdout line by line as it
+        arrives instead of buffering everything in communicate(); useful
+        for commands with large output such as listDirectoryInGuest or
+        listProcessesInGuest on busy guests.'''
+        quiet = kwargs.pop('quiet', False)
+        arguments = kwargs.pop('arguments', ())
+
+        try:
+            base = self._cmd_base[cmd]
+        except KeyError:
+            base = self._cmd_base[cmd] = self._prefix + (cmd,)
+        cmds = list(base)
+        cmds.extend(a for a in args if a is not None)
+        cmds.extend(a for a in arguments if a is not None)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(" ".join("'{}'".format(c.replace("'", "\\'")) if ' ' in c else c for c in cmds))
+
+        startupinfo = None
+        if os.name == "nt":
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.SW_HIDE | subprocess.STARTF_USESHOWWINDOW
+        proc = subprocess.Popen(cmds, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startupinfo, **_POPEN_KWARGS)
+        try:
+            for line in proc.stdout:
+                yield b2s(line).rstrip('\r\n')
+        finally:
+            # Close our end of stdout first: a consumer that stops early
+            # leaves the child blocked writing into a full pipe, and
+            # draining stderr while it is would deadlock both sides.
+            proc.stdout.close()
+            stderrdata = b2s(proc.stderr.read())
+            proc.stderr.close()
+            proc.wait()
+            if proc.returncode and self.raise_errors:
+                raise VMrunError(cmd, proc.returncode, None, stderrdata)
+            if stderrdata and not quiet:
+                logger.error(stderrdata.strip())
+            logger.debug("(⏎ %s)", proc.returncode)
+
     ############################################################################
     # POWER COMMANDS           PARAMETERS           DESCRIPTION
     # --------------           ----------           -----------
@@ -177,7 +511,7 @@ class VMrun(object):
 
     def stop(self, mode='soft', quiet=False):
         '''Stop a VM or Team'''
-        return self.vmrun('stop', self.vmx_file, mode, quiet=quiet)
+        return self.vmrun('stop', self.vmx_file, mode, quiet=quiet, capture=False)
 
     def reset(self, mode='soft', quiet=False):
         '''Reset a VM or Team'''
@@ -185,15 +519,15 @@ class VMrun(object):
 
     def suspend(self, mode='soft', quiet=False):
         '''Suspend a VM or Team'''
-        return self.vmrun('suspend', self.vmx_file, mode, quiet=quiet)
+        return self.vmrun('suspend', self.vmx_file, mode, quiet=quiet, capture=False)
 
     def pause(self, quiet=False):
         '''Pause a VM'''
-        return self.vmrun('pause', self.vmx_file, quiet=quiet)
+        return self.vmrun('pause', self.vmx_file, quiet=quiet, capture=False)
 
     def unpause(self, quiet=False):
         '''Unpause a VM'''
-        return self.vmrun('unpause', self.vmx_file, quiet=quiet)
+        return self.vmrun('unpause', self.vmx_file, quiet=quiet, capture=False)
 
     ############################################################################
     # SNAPSHOT COMMANDS        PARAMETERS           DESCRIPTION
@@ -214,19 +548,19 @@ class VMrun(object):
 
     def listSnapshots(self, show_tree=False, quiet=False):
         '''List all snapshots in a VM'''
-        return self.vmrun('listSnapshots', self.vmx_file, 'showTree' if show_tree else None, quiet=quiet)
+        return self.vmrun('listSnapshots', self.vmx_file, *(('showTree',) if show_tree else ()), quiet=quiet)
 
     def snapshot(self, snap_name, quiet=False):
         '''Create a snapshot of a VM'''
-        return self.vmrun('snapshot', self.vmx_file, snap_name, quiet=quiet)
+        return self.vmrun('snapshot', self.vmx_file, snap_name, quiet=quiet, capture=False)
 
     def deleteSnapshot(self, snap_name, and_delete_children=False, quiet=False):
         '''Remove a snapshot from a VM'''
-        return self.vmrun('deleteSnapshot', self.vmx_file, snap_name, 'andDeleteChildren' if and_delete_children else None, quiet=quiet)
+        return self.vmrun('deleteSnapshot', self.vmx_file, snap_name, *(('andDeleteChildren',) if and_delete_children else ()), quiet=quiet, capture=False)
 
     def revertToSnapshot(self, snap_name, quiet=False):
         '''Set VM state to a snapshot'''
-        return self.vmrun('revertToSnapshot', self.vmx_file, snap_name, quiet=quiet)
+        return self.vmrun('revertToSnapshot', self.vmx_file, snap_name, quiet=quiet, capture=False)
 
     ############################################################################
     # NETWORKADAPTER COMMANDS  PARAMETERS           DESCRIPTION
@@ -254,11 +588,11 @@ class VMrun(object):
 
     def addNetworkAdapter(self, adapter_type, host_network=None, quiet=False):
         '''Add a network adapter on a VM'''
-        return self.vmrun('addNetworkAdapter', self.vmx_file, adapter_type, host_network, quiet=quiet)
+        return self.vmrun('addNetworkAdapter', self.vmx_file, adapter_type, *(() if host_network is None else (host_network,)), quiet=quiet)
 
     def setNetworkAdapter(self, adapter_index, adapter_type, host_network=None, quiet=False):
         '''Update a network adapter on a VM'''
-        return self.vmrun('setNetworkAdapter', self.vmx_file, adapter_index, adapter_type, host_network, quiet=quiet)
+        return self.vmrun('setNetworkAdapter', self.vmx_file, adapter_index, adapter_type, *(() if host_network is None else (host_network,)), quiet=quiet)
 
     def deleteNetworkAdapter(self, adapter_index, quiet=False):
         '''Remove a network adapter on a VM'''
@@ -293,7 +627,7 @@ class VMrun(object):
 
     def setPortForwarding(self, host_network, protocol, host_port, guest_ip, guest_port, description=None, quiet=False):
         '''Add or update a port forwarding on a host network'''
-        return self.vmrun('setPortForwarding', host_network, protocol, host_port, guest_ip, guest_port, description, quiet=quiet)
+        return self.vmrun('setPortForwarding', host_network, protocol, host_port, guest_ip, guest_port, *(() if description is None else (description,)), quiet=quiet)
 
     def deletePortForwarding(self, host_network, protocol, host_port, quiet=False):
         '''Delete a port forwarding on a host network'''
@@ -397,15 +731,64 @@ class VMrun(object):
     #
 
     def runProgramInGuest(self, program_path, program_arguments=[], wait=True, activate_window=False, interactive=False, quiet=False):
-        return self.vmrun('runProgramInGuest', self.vmx_file, None if wait else '-noWait', '-activateWindow' if activate_window else None, '-interactive' if interactive else None, program_path, arguments=program_arguments, quiet=quiet)
+        args = [self.vmx_file]
+        if not wait:
+            args.append('-noWait')
+        if activate_window:
+            args.append('-activateWindow')
+        if interactive:
+            args.append('-interactive')
+        args.append(program_path)
+        return self.vmrun('runProgramInGuest', *args, arguments=program_arguments, quiet=quiet)
 
     def fileExistsInGuest(self, file, quiet=False):
         '''Check if a file exists in Guest OS'''
-        return 'not' not in self.execute('fileExistsInGuest', self.vmx_file, file)
+        stdoutdata = self.vmrun('fileExistsInGuest', self.vmx_file, file, quiet=quiet)
+        # vmrun answers with one short sentence ("The file exists." or
+        # "The file does not exist."); only its head needs scanning.
+        return stdoutdata is not None and 'not' not in stdoutdata[:64]
 
     def directoryExistsInGuest(self, path, quiet=False):
         '''Check if a directory exists in Guest OS'''
-        return 'not' not in self.execute('directoryExistsInGuest', self.vmx_file, path)
+        stdoutdata = self.vmrun('directoryExistsInGuest', self.vmx_file, path, quiet=quiet)
+        return stdoutdata is not None and 'not' not in stdoutdata[:64]
+
+    def _pathsExistInGuest(self, paths, test, fallback, quiet=False):
+        '''Probe many guest paths with one /bin/sh script roundtrip.
+
+        Tests every path with the shell `test` operator in a single script
+        and collects the answers through one file copy, instead of paying
+        a vmrun spawn per path. Falls back to per-path `fallback` probes
+        when the guest cannot run the script (e.g. no POSIX shell).
+        Returns a list of booleans in input order.'''
+        paths = list(paths)
+        if not paths:
+            return []
+        results_path = '/tmp/mech_paths_exist'
+        quoted = ' '.join("'{}'".format(p.replace("'", "'\\''")) for p in paths)
+        script = 'for f in {}; do if [ {} "$f" ]; then echo 1; else echo 0; fi; done > {}'.format(quoted, test, results_path)
+        if self.runScriptInGuest('/bin/sh', script, quiet=quiet) is None:
+            return [fallback(p, quiet=quiet) for p in paths]
+        fp = tempfile.NamedTemporaryFile(delete=False)
+        try:
+            fp.close()
+            if self.copyFileFromGuestToHost(results_path, fp.name, quiet=quiet) is None:
+                return [fallback(p, quiet=quiet) for p in paths]
+            flags = open(fp.name).read().split()
+        finally:
+            os.unlink(fp.name)
+        self.deleteFileInGuest(results_path, quiet=True)
+        if len(flags) != len(paths):
+            return [fallback(p, quiet=quiet) for p in paths]
+        return [flag == '1' for flag in flags]
+
+    def filesExistInGuest(self, files, quiet=False):
+        '''Check if many files exist in Guest OS with one script roundtrip.'''
+        return self._pathsExistInGuest(files, '-e', self.fileExistsInGuest, quiet=quiet)
+
+    def directoriesExistInGuest(self, paths, quiet=False):
+        '''Check if many directories exist in Guest OS with one script roundtrip.'''
+        return self._pathsExistInGuest(paths, '-d', self.directoryExistsInGuest, quiet=quiet)
 
     def setSharedFolderState(self, share_name, new_path, mode='readonly', quiet=False):
         '''Modify a Host-Guest shared folder'''
@@ -420,11 +803,11 @@ class VMrun(object):
         return self.vmrun('removeSharedFolder', self.vmx_file, share_name, quiet=quiet)
 
     def enableSharedFolders(self, runtime=None, quiet=False):
-        return self.vmrun('enableSharedFolders', self.vmx_file, runtime, quiet=quiet)
+        return self.vmrun('enableSharedFolders', self.vmx_file, *(() if runtime is None else (runtime,)), quiet=quiet, capture=False)
 
     def disableSharedFolders(self, runtime=None, quiet=False):
         '''Disable shared folders in Guest'''
-        return self.vmrun('disableSharedFolders', self.vmx_file, runtime, quiet=quiet)
+        return self.vmrun('disableSharedFolders', self.vmx_file, *(() if runtime is None else (runtime,)), quiet=quiet, capture=False)
 
     def listProcessesInGuest(self, quiet=False):
         '''List running processes in Guest OS'''
@@ -432,11 +815,18 @@ class VMrun(object):
 
     def killProcessInGuest(self, pid, quiet=False):
         '''Kill a process in Guest OS'''
-        return self.vmrun('killProcessInGuest', self.vmx_file, pid, quiet=quiet)
+        return self.vmrun('killProcessInGuest', self.vmx_file, pid, quiet=quiet, capture=False)
 
     def runScriptInGuest(self, interpreter_path, script, wait=True, activate_window=False, interactive=False, quiet=False):
         '''Run a script in Guest OS'''
-        return self.vmrun('runScriptInGuest', self.vmx_file, interpreter_path, script, None if wait else '-noWait', '-activateWindow' if activate_window else None, '-interactive' if interactive else None, quiet=quiet)
+        args = [self.vmx_file, interpreter_path, script]
+        if not wait:
+            args.append('-noWait')
+        if activate_window:
+            args.append('-activateWindow')
+        if interactive:
+            args.append('-interactive')
+        return self.vmrun('runScriptInGuest', *args, quiet=quiet)
 
     def deleteFileInGuest(self, file, quiet=False):
         '''Delete a file in Guest OS'''
@@ -476,11 +866,11 @@ class VMrun(object):
 
     def connectNamedDevice(self, device_name, quiet=False):
         '''Connect the named device in the Guest OS'''
-        return self.vmrun('connectNamedDevice', self.vmx_file, device_name, quiet=quiet)
+        return self.vmrun('connectNamedDevice', self.vmx_file, device_name, quiet=quiet, capture=False)
 
     def disconnectNamedDevice(self, device_name, quiet=False):
         '''Disconnect the named device in the Guest OS'''
-        return self.vmrun('disconnectNamedDevice', self.vmx_file, device_name, quiet=quiet)
+        return self.vmrun('disconnectNamedDevice', self.vmx_file, device_name, quiet=quiet, capture=False)
 
     def captureScreen(self, path_on_host, quiet=False):
         '''Capture the screen of the VM to a local file'''
@@ -488,11 +878,19 @@ class VMrun(object):
 
     def writeVariable(self, var_name, var_value, mode=None, quiet=False):
         '''Write a variable in the VM state'''
-        return self.vmrun('writeVariable', self.vmx_file, mode, var_name, var_value, quiet=quiet)
+        args = [self.vmx_file]
+        if mode is not None:
+            args.append(mode)
+        args.extend((var_name, var_value))
+        return self.vmrun('writeVariable', *args, quiet=quiet)
 
     def readVariable(self, var_name, mode=None, quiet=False):
         '''Read a variable in the VM state'''
-        return self.vmrun('readVariable', self.vmx_file, mode, var_name, quiet=quiet)
+        args = [self.vmx_file]
+        if mode is not None:
+            args.append(mode)
+        args.append(var_name)
+        return self.vmrun('readVariable', *args, quiet=quiet)
 
     def getGuestIPAddress(self, wait=True, quiet=False, lookup=False):
         '''Gets the IP address of the guest'''
@@ -509,7 +907,7 @@ class VMrun(object):
                     return None
             finally:
                 os.unlink(fp.name)
-        ip = self.vmrun('getGuestIPAddress', self.vmx_file, '-wait' if wait else None, quiet=quiet)
+        ip = self.vmrun('getGuestIPAddress', self.vmx_file, *(('-wait',) if wait else ()), quiet=quiet)
         if ip == 'unknown':
             ip = ''
         return ip
@@ -570,7 +968,7 @@ class VMrun(object):
 
     def clone(self, dest_vmx, mode, snap_name=None, quiet=False):
         '''Create a copy of the VM'''
-        return self.vmrun('clone', self.vmx_file, dest_vmx, mode, snap_name, quiet=quiet)
+        return self.vmrun('clone', self.vmx_file, dest_vmx, mode, *(() if snap_name is None else (snap_name,)), quiet=quiet)
 
     ############################################################################
     # RECORD/REPLAY COMMANDS   PARAMETERS           DESCRIPTION
@@ -588,22 +986,22 @@ class VMrun(object):
     def beginRecording(self, snap_name, quiet=False):
         # unavailable in VMware Fusion 10 (OS X)?
         '''Begin recording a VM'''
-        return self.vmrun('beginRecording', self.vmx_file, snap_name, quiet=quiet)
+        return self.vmrun('beginRecording', self.vmx_file, snap_name, quiet=quiet, capture=False)
 
     def endRecording(self, quiet=False):
         # unavailable in VMware Fusion 10 (OS X)?
         '''End recording a VM'''
-        return self.vmrun('endRecording', self.vmx_file, quiet=quiet)
+        return self.vmrun('endRecording', self.vmx_file, quiet=quiet, capture=False)
 
     def beginReplay(self, snap_name, quiet=False):
         # unavailable in VMware Fusion 10 (OS X)?
         '''Begin replaying a VM'''
-        return self.vmrun('beginReplay', self.vmx_file, snap_name, quiet=quiet)
+        return self.vmrun('beginReplay', self.vmx_file, snap_name, quiet=quiet, capture=False)
 
     def endReplay(self, quiet=False):
         # unavailable in VMware Fusion 10 (OS X)?
         '''End replaying a VM'''
-        return self.vmrun('endReplay', self.vmx_file, quiet=quiet)
+        return self.vmrun('endReplay', self.vmx_file, quiet=quiet, capture=False)
 
     ############################################################################
     # VPROBE COMMANDS          PARAMETERS           DESCRIPTION
@@ -654,6 +1052,25 @@ class VMrun(object):
 
     ############################################################################
 
-    def installedTools(self, quiet=False):
+    def installedTools(self, quiet=False, ttl=TOOLS_STATE_TTL):
+        '''Check whether VMware Tools are installed in the guest.
+
+        A positive result is trusted until a state-changing command
+        (start, stop, reset, suspend, revertToSnapshot, installTools)
+        invalidates it; a negative one is re-probed after `ttl` seconds.
+        Pass ttl=0 to also force a fresh roundtrip on negatives.'''
+        now = _monotonic()
+        if self._tools_state is not None:
+            timestamp, installed = self._tools_state
+            if installed or (ttl and now - timestamp < ttl):
+                return installed
         state = self.checkToolsState(quiet=quiet)
-        return state in ('installed', 'running')
+        installed = state in ('installed', 'running')
+        self._tools_state = (now, installed)
+        return installed
+
+
+if PY3:
+    # Attach the `vmrun_async` core and a `*_async` sibling for every command
+    # so callers can `asyncio.gather` many guest operations concurrently.
+    from . import vmrun_async  # noqa
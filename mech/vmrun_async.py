@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 German Mendez Bravo (Kronuz)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+from __future__ import absolute_import
+
+import os
+import asyncio
+import logging
+import functools
+import subprocess
+
+from .compat import b2s
+from .vmrun import VMrun, VMrunError, TOOLS_STATE_TTL, _TOOLS_STATE_CHANGERS, _monotonic
+
+logger = logging.getLogger(__name__)
+
+
+async def vmrun_async(self, cmd, *args, **kwargs):
+    '''Asynchronous sibling of ``VMrun.vmrun``.
+
+    Builds the exact same command line but forks the child through
+    ``asyncio.create_subprocess_exec`` and awaits its completion, so many
+    guest operations can run concurrently with ``asyncio.gather``.
+    '''
+    quiet = kwargs.pop('quiet', False)
+    capture = kwargs.pop('capture', True)
+    arguments = kwargs.pop('arguments', ())
+
+    if cmd in _TOOLS_STATE_CHANGERS:
+        self._tools_state = None
+
+    try:
+        base = self._cmd_base[cmd]
+    except KeyError:
+        base = self._cmd_base[cmd] = self._prefix + (cmd,)
+    cmds = list(base)
+    cmds.extend(a for a in args if a is not None)
+    cmds.extend(a for a in arguments if a is not None)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(" ".join("'{}'".format(c.replace("'", "\\'")) if ' ' in c else c for c in cmds))
+
+    popen_kwargs = {}
+    if os.name == "nt":
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.SW_HIDE | subprocess.STARTF_USESHOWWINDOW
+        popen_kwargs['startupinfo'] = startupinfo
+    proc = await asyncio.create_subprocess_exec(*cmds, stdout=asyncio.subprocess.PIPE if capture else subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE, **popen_kwargs)
+    stdoutdata, stderrdata = map(b2s, await proc.communicate())
+
+    if stderrdata and not quiet and not self.raise_errors:
+        logger.error(stderrdata.strip())
+    logger.debug("(⏎ %s)", proc.returncode)
+
+    if not proc.returncode:
+        if not capture:
+            return ''
+        stdoutdata = stdoutdata.strip()
+        logger.debug("%r", stdoutdata)
+        return stdoutdata
+
+    if self.raise_errors:
+        raise VMrunError(cmd, proc.returncode, stdoutdata, stderrdata)
+
+    if stdoutdata and not quiet:
+        logger.error(stdoutdata.strip())
+
+
+class _VMrunRecorder(object):
+    '''Stand-in for a ``VMrun`` instance which records the single
+    ``vmrun(cmd, *args, **kwargs)`` call a method would have issued.'''
+
+    def __init__(self, vm):
+        self.__dict__.update(vm.__dict__)
+        # The instance pre-binds vmrun to itself; drop that copy so the
+        # recording vmrun below is the one the method bodies see.
+        self.__dict__.pop('vmrun', None)
+        self.recorded = None
+
+    def vmrun(self, cmd, *args, **kwargs):
+        self.recorded = (cmd, args, kwargs)
+
+
+def _make_async(func):
+    @functools.wraps(func)
+    async def async_sibling(self, *args, **kwargs):
+        recorder = _VMrunRecorder(self)
+        func(recorder, *args, **kwargs)
+        cmd, cargs, ckwargs = recorder.recorded
+        return await self.vmrun_async(cmd, *cargs, **ckwargs)
+    async_sibling.__name__ = func.__name__ + '_async'
+    async_sibling.__qualname__ = 'VMrun.' + async_sibling.__name__
+    return async_sibling
+
+
+async def fileExistsInGuest_async(self, file, quiet=False):
+    '''Check if a file exists in Guest OS'''
+    stdoutdata = await self.vmrun_async('fileExistsInGuest', self.vmx_file, file, quiet=quiet)
+    return stdoutdata is not None and 'not' not in stdoutdata[:64]
+
+
+async def directoryExistsInGuest_async(self, path, quiet=False):
+    '''Check if a directory exists in Guest OS'''
+    stdoutdata = await self.vmrun_async('directoryExistsInGuest', self.vmx_file, path, quiet=quiet)
+    return stdoutdata is not None and 'not' not in stdoutdata[:64]
+
+
+async def getGuestIPAddress_async(self, wait=True, quiet=False, lookup=False):
+    '''Gets the IP address of the guest'''
+    if lookup is True:
+        # The lookup dance copies files around; run the whole synchronous
+        # implementation in a worker thread instead of duplicating it here.
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, functools.partial(VMrun.getGuestIPAddress, self, wait=wait, quiet=quiet, lookup=lookup))
+    ip = await self.vmrun_async('getGuestIPAddress', self.vmx_file, '-wait' if wait else None, quiet=quiet)
+    if ip == 'unknown':
+        ip = ''
+    return ip
+
+
+async def installedTools_async(self, quiet=False, ttl=TOOLS_STATE_TTL):
+    '''Check whether VMware Tools are installed in the guest.
+
+    Shares the cache (and its invalidation rules) with the synchronous
+    `installedTools`.'''
+    now = _monotonic()
+    if self._tools_state is not None:
+        timestamp, installed = self._tools_state
+        if installed or (ttl and now - timestamp < ttl):
+            return installed
+    state = await self.checkToolsState_async(quiet=quiet)
+    installed = state in ('installed', 'running')
+    self._tools_state = (now, installed)
+    return installed
+
+
+#: Methods whose bodies do more than issue a single ``self.vmrun()`` call
+#: get a hand-written async sibling above instead of a generated one.
+_HANDWRITTEN = {
+    'fileExistsInGuest': fileExistsInGuest_async,
+    'directoryExistsInGuest': directoryExistsInGuest_async,
+    'getGuestIPAddress': getGuestIPAddress_async,
+    'installedTools': installedTools_async,
+}
+
+
+def _install():
+    # Snapshot the class dict before attaching vmrun_async so the loop
+    # cannot pick it up and publish a broken vmrun_async_async.
+    names = list(vars(VMrun))
+    VMrun.vmrun_async = vmrun_async
+    for name in names:
+        if name.startswith('_') or name in ('vmrun', 'vmrun_stream', 'batch', 'filesExistInGuest', 'directoriesExistInGuest'):
+            continue
+        func = vars(VMrun)[name]
+        if not callable(func):
+            continue
+        if name in _HANDWRITTEN:
+            setattr(VMrun, name + '_async', _HANDWRITTEN[name])
+        else:
+            setattr(VMrun, name + '_async', _make_async(func))
+
+
+_install()